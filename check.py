@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+# Checks how expressions reduce and print, run with python3 check.py from the repository root
+
+import importlib.util
+import os
+import sys
+
+# Load lambda.py, which can't be imported by name since lambda is a keyword
+spec = importlib.util.spec_from_file_location('lambda_eval', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambda.py'))
+lambda_eval = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(lambda_eval)
+
+# Expressions and the normal forms they print as, or the error they raise
+NORMAL_FORMS = [
+    # README example
+    (r'(\x.\y.y x) a (\x.x)', 'a'),
+    # Already normal
+    (r'\x y z.x z (y z)', r'(\x y z.x z (y z))'),
+    # Church numerals, times 2 3
+    (r'(\m.\n.\f.\x.m (n f) x) (\f.\x.f (f x)) (\f.\x.f (f (f x)))', r'(\f.\x.f (f (f (f (f (f x))))))'),
+    # Substituting a free variable doesn't get captured by a param with the same name
+    (r'(\x.\y.x) y z', 'y'),
+    (r'(\x.\y.x y) y', r'(\ya.y ya)'),
+    (r'(\x.\y.\z.x y z) y z x', 'y z x'),
+    # Params are renamed only when they would capture something
+    (r'(\x.\y.x) y', r'(\ya.y)'),
+    (r'(\x.\y.x) (\z.y)', r'(\ya.\z.y)'),
+    (r'\y.(\x.\y.x y) y', r'(\y.\ya.y ya)'),
+    # A repeated param refers to its first occurrence, and keeps its name unless it would capture something
+    (r'\x x.x', r'(\x x.x)'),
+    (r'(\x x.x) a b', 'a'),
+    (r'(\a.\x x.a) x', r'(\xa xa.x)'),
+    (r'z (\x y.y) (\x x.z)', r'z (\x y.y) (\x x.z)'),
+    # Multi-param functions need all of their args
+    (r'(\z z.z) b', 'Runtime error: Not enough arguments given to satisfy the function (\\z z.z). Expected 2, got 1.'),
+]
+
+# Expressions and the messages stepping them gives
+MESSAGES = [
+    (r'(\x.\y.(\z.y) x) y', [
+        r'Applied (\x.\y.(\z.y) x) to y, generating (\ya.(\z.ya) y)',
+        r'Applied (\z.ya) to y, generating ya',
+    ]),
+    (r'\q.(\x.\y.x y) (\w.q w)', [
+        r'Applied (\x.\y.x y) to (\w.q w), generating (\y.(\w.q w) y)',
+        r'Applied (\w.q w) to y, generating q y',
+    ]),
+]
+
+# Print what an expression reduces to, or its error
+def run(expression, normalize):
+    evaluator = lambda_eval.Evaluator(expression)
+    try:
+        if normalize:
+            evaluator.normalize()
+        else:
+            evaluator.reduce_all()
+    except lambda_eval.EvaluationException as e:
+        return str(e)
+    return evaluator.pretty_print()
+
+failures = 0
+for expression, expected in NORMAL_FORMS:
+    for normalize in (False, True):
+        got = run(expression, normalize)
+        if got != expected:
+            failures += 1
+            print(f'{expression} ({"normalize" if normalize else "reduce_all"}): expected {expected}, got {got}')
+for expression, expected in MESSAGES:
+    evaluator = lambda_eval.Evaluator(expression)
+    got = []
+    while evaluator.reduce_once():
+        got.append(evaluator.get_message())
+    if got != expected:
+        failures += 1
+        print(f'{expression}: expected messages {expected}, got {got}')
+print(f'{failures} failures' if failures else 'All checks passed')
+sys.exit(1 if failures else 0)
@@ -1,8 +1,47 @@
 #!/usr/bin/env python3
 
-import re
 import curses
 import argparse
+import sys
+from bisect import bisect_left
+from functools import lru_cache
+
+# Token types, interned so they can be compared by identity
+TOK_LAMBDA = sys.intern('LAMBDA')
+TOK_DOT = sys.intern('DOT')
+TOK_ATOM = sys.intern('ATOM')
+TOK_LPAREN = sys.intern('LPAREN')
+TOK_RPAREN = sys.intern('RPAREN')
+TOK_WHITESPACE = sys.intern('WHITESPACE')
+TOK_EOF = sys.intern('EOF')
+
+# Tokens an expression can start with
+_EXPRESSION_FIRST = frozenset((TOK_ATOM, TOK_LPAREN))
+
+# AST node kinds
+K_ATOM = 0
+K_FUN = 1
+K_APP = 2
+K_VAR = 3
+
+# Value kinds of the environment based evaluator, values are tuples starting with their kind:
+#   V_FREE: (V_FREE, atom node)
+#   V_BOUND: (V_BOUND, binder level, name) variable of a function being read back
+#   V_CLOSURE: (V_CLOSURE, function node, environment, compiled body)
+#   V_NEUTRAL: (V_NEUTRAL, head value, arg thunks) application that can't be contracted
+# Compiled code may also leave work for _finish to do rather than recursing:
+#   V_CALL: (V_CALL, compiled body, environment) call of a function body
+#   V_FORCE: (V_FORCE, thunk) thunk that hasn't been evaluated yet
+#   V_APPLY: (V_APPLY, compiled head, environment, compiled args) application
+# Environments are tuples of thunks, innermost binder last, thunks are lists [value, compiled code, environment] with
+# code and environment cleared once the value has been computed
+V_FREE = 0
+V_BOUND = 1
+V_CLOSURE = 2
+V_NEUTRAL = 3
+V_CALL = 4
+V_FORCE = 5
+V_APPLY = 6
 
 # Custom exceptions
 class LexingException(Exception):
@@ -12,259 +51,376 @@ class ParsingException(Exception):
 class EvaluationException(Exception):
     pass
 
-# Lexer class, generates tokens one-by-one
+# AST node, trees are shared between steps and parses so only s ever changes after building, fields depend on kind:
+#   K_ATOM: x = name of a free variable
+#   K_VAR: x = de Bruijn index of a bound variable, y = name as written
+#   K_FUN: x = tuple of parameter names, y = body node
+#   K_APP: x = tuple of applied nodes
+# s is False once stepping has found the node already normal, None otherwise
+# f is how many binders outside of the node its variables reach, 0 if no variable in it is bound outside of it
+class Node:
+    __slots__ = ('k', 'x', 'y', 's', 'f')
+    def __init__(self, k, x, y=None):
+        self.k = k
+        self.x = x
+        self.y = y
+        self.s = None
+        f = 0
+        if k == K_APP:
+            for item in x:
+                if item.f > f:
+                    f = item.f
+        elif k == K_VAR:
+            f = x + 1
+        elif k == K_FUN and y.f > len(x):
+            f = y.f - len(x)
+        self.f = f
+
+# Build table mapping each ASCII character to the token it starts
+def _build_dispatch():
+    # List of single-character tokens (name, character)
+    tokens = (
+        (TOK_LAMBDA, '\\'),
+        (TOK_DOT, '.'),
+        (TOK_LPAREN, '('),
+        (TOK_RPAREN, ')')
+    )
+    dispatch = [None] * 128
+    for token_name, token_char in tokens:
+        dispatch[ord(token_char)] = token_name
+    for code in range(128):
+        if chr(code).isalpha():
+            dispatch[code] = TOK_ATOM
+        elif chr(code).isspace():
+            dispatch[code] = TOK_WHITESPACE
+    return tuple(dispatch)
+
+# Dispatch table shared by every lexer, built once per process
+_DISPATCH = _build_dispatch()
+
+# Lexer class, turns the input into a list of tokens in a single pass
 class Lexer:
     def __init__(self, input_stream):
-        # List of tokens (name, regular expression, save result)
-        tokens = (
-            ('LAMBDA', r'\\', False),
-            ('DOT', r'\.', False),
-            ('ATOM', r'[a-zA-Z]+', True),
-            ('LPAREN', r'\(', False),
-            ('RPAREN', r'\)', False),
-            ('WHITESPACE', r'\s+', None)
-        )
-        # Compile tokens into dict with RE's
-        self._tokens = {
-            token_name: (re.compile(token_re), token_save) for token_name, token_re, token_save in tokens
-        }
-        # Current position in input stream
-        self._position = 0
+        # Dispatch table mapping each ASCII character to the token it starts
+        self._dispatch = _DISPATCH
         # Input stream
         self._input_stream = input_stream
-        # Advance one
-        self.advance()
-    def reset(self):
-        self._position = 0
-    def advance(self):
-        # If at end of input, return EOF
-        if self._position >= len(self._input_stream):
-            return ('EOF', None, len(self._input_stream))
-        # Initialize with None
-        current_match = None
-        current_token = None
-        # Try each possible token
-        for token_name, (token_re, _) in self._tokens.items():
-            # Match starting at current position
-            match = token_re.search(self._input_stream, self._position)
-            # If match exists and is at start of search area...
-            if match is not None and match.span()[0] == self._position: 
-                # Save match
-                current_match = match
-                current_token = token_name
-                # Exit loop (no possible token overlap so can do this!)
-                break
-        # If can't find match, raise an exception
-        if current_match is None:
-            raise LexingException(f'Lexer Error: unexpected character at position {self._position}')
-        # Get save setting of found token
-        _, token_save = self._tokens[current_token]
-        # Save current position
-        saved_position = self._position
-        # Advance position
-        self._position += current_match.span()[1] - current_match.span()[0]
-        # Handle return
-        if token_save is not None:
-            return (current_token, None if token_save == False else current_match.group(), saved_position)
-        # If skippable token like whitespace, advance again to get next real token
-        else:
-            return self.advance()
+    # Classify a single character, None if it can't start a token
+    def _classify(self, char):
+        code = ord(char)
+        if code < 128:
+            return self._dispatch[code]
+        # Non-ASCII characters can only be whitespace
+        return TOK_WHITESPACE if char.isspace() else None
+    # Generate every token of the input, ending with EOF
+    def tokenize(self):
+        # Keep locals for the hot loop
+        input_stream = self._input_stream
+        length = len(input_stream)
+        position = 0
+        dispatch = self._dispatch
+        tokens = []
+        append = tokens.append
+        while position < length:
+            # Find token started by current character, only leaving the table for non-ASCII
+            code = ord(input_stream[position])
+            token_name = dispatch[code] if code < 128 else self._classify(input_stream[position])
+            # If no token starts here, raise an exception
+            if token_name is None:
+                raise LexingException(f'Lexer Error: unexpected character at position {position}')
+            start = position
+            position += 1
+            # Atoms consume a run of ASCII letters
+            if token_name is TOK_ATOM:
+                while position < length:
+                    code = ord(input_stream[position])
+                    if code >= 128 or dispatch[code] is not TOK_ATOM:
+                        break
+                    position += 1
+                # Intern names so the many occurrences of a name share one string and compare by identity first
+                append((TOK_ATOM, sys.intern(input_stream[start:position]), start))
+            # Whitespace consumes a run of whitespace and is skipped
+            elif token_name is TOK_WHITESPACE:
+                while position < length:
+                    code = ord(input_stream[position])
+                    if (dispatch[code] if code < 128 else self._classify(input_stream[position])) is not TOK_WHITESPACE:
+                        break
+                    position += 1
+            else:
+                append((token_name, None, start))
+        # End with EOF
+        append((TOK_EOF, None, length))
+        return tokens
 
 # Parser, generates AST from input
 class Parser:
     # Constructor
     def __init__(self, input_stream):
-        # Create lexer object
-        self._lexer = Lexer(input_stream)
-        # Store current token
-        self._current_token = None
-    # Raise an exception
-    def _exception(self):
-        raise ParsingException(f'Parsing Error: Unexpected token at position {self._current_token[2]}')
-    # Advance to next token, return current token
-    def _pop(self):
-        saved_token = self._current_token
-        self._current_token = self._lexer.advance()
-        return saved_token
-    # Return type of current token
-    def _peek(self):
-        return self._current_token[0]
-    # Expect certain terminal, pop and return if is at start of stream, error if not 
-    def _expect(self, token):
-        if self._peek() != token:
-            self._exception()
-        return self._pop()
-    # Parse given token stream
+        # Lex the whole input up front
+        self._tokens = Lexer(input_stream).tokenize()
+    # Parse given token stream, nonterminals are closures so parsing state lives in local variables, and
+    # token checks are written out at each use rather than going through peek/pop/expect helpers
     def parse(self):
-        # Reset lexer
-        self._lexer.reset()
-        # Get first token
-        self._current_token = self._lexer.advance()
-        # Parse program nonterminal
-        return self._program()
-    # Program nonterminal
-    def _program(self):
-        # Parse statement nonterminal
-        statement = self._statement()
-        # Expect EOF token
-        self._expect('EOF')
-        # If successful, return full tree
-        return statement
-    # Statement nonterminal
-    def _statement(self):
-        # If starts with lambda, use that production
-        if self._peek() == 'LAMBDA':
+        tokens = self._tokens
+        # Index of current token
+        index = 0
+        # Number of binders enclosing the current position
+        depth = 0
+        # Binder positions of each bound name, innermost last
+        bound = {}
+        # Raise an exception
+        def exception():
+            raise ParsingException(f'Parsing Error: Unexpected token at position {tokens[index][2]}')
+        # Function production of the statement nonterminal
+        def function():
+            nonlocal index, depth
             # Get rid of the lambda
-            self._pop()
+            index += 1
             # Parse binding nonterminal
-            binding = self._binding()
+            names = binding()
             # Expect a dot
-            self._expect('DOT')
+            if tokens[index][0] is not TOK_DOT:
+                exception()
+            index += 1
+            # Bring params into scope, a repeated param refers to its first occurrence
+            positions = {}
+            for i, name in enumerate(names):
+                positions.setdefault(name, depth + i)
+            for name, position in positions.items():
+                bound.setdefault(name, []).append(position)
+            depth += len(names)
             # Parse statement after binding
-            statement = self._statement()
+            body = statement()
+            # Params go out of scope
+            depth -= len(names)
+            for name in positions:
+                bound[name].pop()
             # If has binding is function, so return function expression
-            return ('FUNCTION', binding, statement)
-        # Otherwise, should start with lparen or atom, parse application nonterminal if so
-        elif self._peek() == 'LPAREN' or self._peek() == 'ATOM':
-            return self._application()
-        # Raise error if get to end
-        self._exception()
-    # Binding nonterminal
-    def _binding(self):
-        # Binding must start w/ atom
-        _, atom_name, _ = self._expect('ATOM')
-        # Get next binding
-        b_prime = self._binding_prime()
-        # Append current atom to list
-        return [atom_name] + b_prime
-    def _binding_prime(self):
-        if self._peek() == 'ATOM':
-            _, atom_name, _ = self._pop()
-            # Get next binding
-            b_prime = self._binding_prime()
-            # Append current atom to list
-            return [atom_name] + b_prime
-        # If no more atoms, return empty list
-        return []
-    # Application nonterminal
-    def _application(self):
-        # Get current expression and following applications
-        expression = self._expression()
-        application = self._application_prime()
-        # If no following applications, just return the expression
-        if len(application) == 0:
-            return expression
-        # Otherwise, return application node
-        return ('APPLICATION', [expression] + application) 
-    # Application prime nonterminal
-    def _application_prime(self):
-        # If atom or lparen, move on to expression
-        if self._peek() == 'ATOM' or self._peek() == 'LPAREN':
-            expression = self._expression()
-            application = self._application_prime()
-            return [expression] + application
-        # Empty list if no atom or lparen
-        return []
-    # Expression nonterminal
-    def _expression(self):
-        # If ATOM, ignore position
-        if self._peek() == 'ATOM':
-            token, value, _ = self._pop()
-            return (token, value)
-        # If not atom, should be parenthesized statement
-        self._expect('LPAREN')
-        statement = self._statement()
-        self._expect('RPAREN')
-        return statement
+            return Node(K_FUN, names, body)
+        # Statement nonterminal
+        def statement():
+            # Look up the production for the current token, starting with lambda is a function, lparen or atom an application
+            production = productions.get(tokens[index][0])
+            # Raise error if no production matches
+            if production is None:
+                exception()
+            return production()
+        # Binding nonterminal
+        def binding():
+            nonlocal index
+            # Binding must start w/ atom
+            if tokens[index][0] is not TOK_ATOM:
+                exception()
+            names = []
+            # Collect atoms (binding prime)
+            while tokens[index][0] is TOK_ATOM:
+                names.append(tokens[index][1])
+                index += 1
+            return tuple(names)
+        # Application nonterminal
+        def application():
+            # Get current expression
+            expressions = [expression()]
+            # Collect following expressions (application prime) while atom or lparen
+            while tokens[index][0] in _EXPRESSION_FIRST:
+                expressions.append(expression())
+            # If no following applications, just return the expression
+            if len(expressions) == 1:
+                return expressions[0]
+            # Otherwise, return application node
+            return Node(K_APP, tuple(expressions))
+        # Expression nonterminal
+        def expression():
+            nonlocal index
+            # If ATOM, ignore position
+            if tokens[index][0] is TOK_ATOM:
+                value = tokens[index][1]
+                index += 1
+                # Bound atoms become the distance to their innermost binder
+                positions = bound.get(value)
+                if positions:
+                    return Node(K_VAR, depth - 1 - positions[-1], value)
+                return Node(K_ATOM, value)
+            # If not atom, should be parenthesized statement
+            if tokens[index][0] is not TOK_LPAREN:
+                exception()
+            index += 1
+            inner = statement()
+            if tokens[index][0] is not TOK_RPAREN:
+                exception()
+            index += 1
+            return inner
+        # LL(1) table for the statement nonterminal, mapping each token it can start with to the production to use
+        productions = {TOK_LAMBDA: function, TOK_ATOM: application, TOK_LPAREN: application}
+        # Program nonterminal, a statement followed by EOF
+        program = statement()
+        if tokens[index][0] is not TOK_EOF:
+            exception()
+        # If successful, return full tree
+        return program
+
+# Parse input stream, reusing the AST if the same input was parsed before
+@lru_cache(maxsize=256)
+def parse_cached(input_stream):
+    return Parser(input_stream).parse()
 
 # Small-step evaluator
 class Evaluator:
-    # Associate a parser w/ evaluator
+    # Associate an input stream w/ evaluator
     def __init__(self, input_stream):
-        self._parser = Parser(input_stream)
-        self._ast = self._parser.parse()
-        self._message = None
+        # Keep the parsed AST to reset to, stepping only marks its normal nodes
+        self._start_ast = parse_cached(input_stream)
+        self._ast = self._start_ast
+        # Last application done (function, args, result), formatted into a message on request
+        self._applied = None
+        # Expression the last application happened in and the application, None if not known
+        self._context = None
     # Reset ast to start
     def reset(self):
-        self._ast = self._parser.parse()
-    # Apply function to args
-    def _apply(self, function, args):
-        _, params, body = function
-        # If just atom, replace 
-        if body[0] == 'ATOM':
-            if body[1] in params:
-                return args[params.index(body[1])][::]
-            return body
-        # If function, do substitution in body for variables not remapped
-        elif body[0] == 'FUNCTION':
-            # Exclude params that exist in function
-            new_params = []
-            new_args = []
-            for i in range(len(params)):
-                if params[i] not in body[1]:
-                    new_params.append(params[i])
-                    new_args.append(args[i])
-            # Do application
-            return ('FUNCTION', body[1][::], self._apply(('FUNCTION', new_params, body[2][::]), new_args))
-        # If application, do substitution for each item in application
-        elif body[0] == 'APPLICATION':
-            new_body = ('APPLICATION', body[1][::])
-            for i in range(len(body[1])):
-                new_body[1][i] = self._apply(('FUNCTION', params, new_body[1][i]), args)
-            return new_body
-    # Returns results of single step, doesn't update member variables
+        self._ast = self._start_ast
+    # Rebuild node with each variable replaced by replace(variable, binders crossed inside node + depth), walks with an explicit stack
+    # replace must leave variables bound by the crossed binders alone, so subtrees whose variables don't reach past them are reused as is
+    def _map_vars(self, node, depth, replace):
+        # Finished subtrees, in order
+        results = []
+        # Work items (node, depth, whether its children are already in results)
+        stack = [(node, depth, False)]
+        while stack:
+            node, depth, built = stack.pop()
+            # Children are done, assemble the node from them, reusing it if none of them changed
+            if built:
+                if node.k == K_FUN:
+                    body = results.pop()
+                    results.append(node if body is node.y else Node(K_FUN, node.x, body))
+                else:
+                    items = tuple(results[-len(node.x):])
+                    del results[-len(node.x):]
+                    changed = False
+                    for new_item, old_item in zip(items, node.x):
+                        if new_item is not old_item:
+                            changed = True
+                            break
+                    results.append(Node(K_APP, items) if changed else node)
+            # No variable in node reaches past the binders crossed, so nothing to replace
+            elif node.f <= depth:
+                results.append(node)
+            elif node.k == K_VAR:
+                results.append(replace(node, depth))
+            # Function body is one binder deeper per param
+            elif node.k == K_FUN:
+                stack.append((node, depth, True))
+                stack.append((node.y, depth + len(node.x), False))
+            # Push application items in reverse so they finish in order
+            elif node.k == K_APP:
+                stack.append((node, depth, True))
+                stack.extend((item, depth, False) for item in reversed(node.x))
+            # Free atoms never change
+            else:
+                results.append(node)
+        return results[0]
+    # Substitute args for the variables bound by the applied function into its body
+    def _apply(self, body, args):
+        def replace(variable, depth):
+            index = variable.x - depth
+            # Bound inside of body, leave alone
+            if index < 0:
+                return variable
+            # Bound by the applied function, move arg under the crossed binders
+            if index < len(args):
+                return self._shift(args[len(args) - 1 - index], depth)
+            # Bound outside of the applied function, which is going away
+            return Node(K_VAR, variable.x - len(args), variable.y)
+        return self._map_vars(body, 0, replace)
+    # Shift variables bound outside of node by amount
+    def _shift(self, node, amount):
+        if amount == 0:
+            return node
+        def replace(variable, depth):
+            # Bound inside of node, leave alone
+            if variable.x < depth:
+                return variable
+            return Node(K_VAR, variable.x + amount, variable.y)
+        return self._map_vars(node, 0, replace)
+    # Build the error for a function applied to too few args, only pretty prints once the error happens
+    def _not_enough_args(self, function, given):
+        return EvaluationException(f'Runtime error: Not enough arguments given to satisfy the function {self.pretty_print(node=function)}. Expected {len(function.x)}, got {given}.')
+    # Build the error for a node that can't be evaluated
+    def _malformed(self, node):
+        if node.k == K_APP:
+            return EvaluationException('Runtime exception: Application must be done on at least two items')
+        return EvaluationException(f'Runtime error: Unkown AST node {node.k}')
+    # Contract the application of the function at the start of application_list
+    def _contract(self, application_list):
+        # Expand function node
+        function = application_list[0]
+        count = len(function.x)
+        # Sanity check: enough args given to satisfy function
+        if len(application_list) - 1 < count:
+            raise self._not_enough_args(function, len(application_list) - 1)
+        # Apply function to args
+        args = application_list[1:1+count]
+        application_result = self._apply(function.y, args)
+        # Remember application for the message
+        self._applied = (function, args, application_result)
+        self._context = None
+        # If nothing else to apply, return singular item
+        if len(application_list) == 1 + count:
+            return application_result
+        # More to apply, return application of the result to the remaining args
+        return Node(K_APP, (application_result, *application_list[1+count:]))
+    # Returns results of single step, marks nodes found normal and records the application in _applied and _context
     def step(self, ast=None):
-        # If didn't pass AST, assume its the root AST (make sure it's a copy!)
+        # If didn't pass AST, assume its the root AST
         if ast is None:
             ast = self._ast
-        # Get type of node
-        node_type = ast[0]
-        # Application is reducable
-        if node_type == 'APPLICATION':
-            application_list = ast[1]
-            if len(application_list) < 2:
-                raise EvaluationException(f'Runtime exception: Application must be done on at least two items')
-            # Check if function at start of application list
-            if application_list[0][0] == 'FUNCTION':
-                # Expand function node
-                _, function_args, function_body = application_list[0]
-                # Sanity check: enough args given to satisfy function
-                if len(application_list) - 1 < len(function_args):
-                    raise EvaluationException(f'Runtime error: Not enough arguments given to satisfy the function {self.pretty_print(node=application_list[0])}. Expected {len(function_args)}, got {len(application_list) - 1}.')
-                # Apply function to args
-                application_result = self._apply(application_list[0], application_list[1:1+len(function_args)])
-                # Make message
-                self._message = 'Applied ' + self.pretty_print(node=application_list[0]) + ' to ' + ' '.join([self.pretty_print(node=x) for x in application_list[1:1+len(function_args)]]) + ', generating ' + self.pretty_print(node=application_result)
-                # Update application list
-                new_application_list = [application_result] + application_list[1+len(function_args):]
-                # If nothing else to apply, return singular item
-                if len(new_application_list) == 1:
-                    return application_result
-                # More to apply, return application
-                return ('APPLICATION', new_application_list)
-            # Function not at beginning, reduce each application item to a value
-            for i, item in enumerate(application_list):
-                # Try to step the item
-                step_result = self.step(ast=item)
-                # If was able to step, return that result
-                if step_result is not None:
-                    # Update application list and return
-                    new_application_list = application_list[::]
-                    new_application_list[i] = step_result
-                    return ('APPLICATION', new_application_list)
-            # Can't do anything else
-            return None
-        # Function body is reducable
-        elif node_type == 'FUNCTION':
-            function_body = ast[2][::]
-            step_result =  self.step(ast=function_body)
-            if step_result is not None:
-                return ('FUNCTION', ast[1][::], step_result)
-            return None
-        # Atom is already normal
-        elif node_type == 'ATOM':
-            return None
-        raise EvaluationException(f'Runtime error: Unkown AST node {node_type}')
+        # Nodes from the root down to the current node, with the index of the child being searched
+        path = []
+        node = ast
+        # Search depth-first for the leftmost outermost reducable application
+        while True:
+            # Get type of node
+            node_type = node.k
+            # Atoms are already normal, other nodes may have been found normal by an earlier step
+            normal = node_type == K_ATOM or node_type == K_VAR or node.s is False
+            # Normal, move on to the next application item that hasn't been searched
+            if normal:
+                node = None
+                while path and node is None:
+                    parent, index = path.pop()
+                    if parent.k == K_APP and index + 1 < len(parent.x):
+                        path.append((parent, index + 1))
+                        node = parent.x[index + 1]
+                    # Searched all of parent without finding anything
+                    else:
+                        parent.s = False
+                # Searched everything, can't do anything else
+                if node is None:
+                    return None
+            # Application is reducable if function at start of application list, otherwise search each item
+            elif node_type == K_APP:
+                if len(node.x) < 2:
+                    raise self._malformed(node)
+                if node.x[0].k == K_FUN:
+                    result = self._contract(node.x)
+                    break
+                path.append((node, 0))
+                node = node.x[0]
+            # Function body is reducable
+            elif node_type == K_FUN:
+                path.append((node, 0))
+                node = node.y
+            else:
+                raise self._malformed(node)
+        # Remember where the application happened so the message can name variables the way the expression does
+        self._context = (ast, node)
+        # Rebuild the nodes above the reduced one, sharing everything else
+        while path:
+            parent, index = path.pop()
+            if parent.k == K_FUN:
+                result = Node(K_FUN, parent.x, result)
+            else:
+                result = Node(K_APP, (*parent.x[:index], result, *parent.x[index+1:]))
+        return result
     # Reduce by one step, return reduction result and wether or not did any reduction
     def reduce_once(self):
         new_ast = self.step()
@@ -279,37 +435,354 @@ class Evaluator:
             self._ast = new_ast
             new_ast = self.step()
         return self._ast
-    # Pretty print current AST node as string
-    def pretty_print(self, node=None, parent_fn=False, parent_app=False):
+    # Compile node into a Python function of an environment, so evaluating it doesn't dispatch on node kinds again
+    def _compile(self, node):
+        node_type = node.k
+        if node_type == K_VAR:
+            position = -1 - node.x
+            # Forcing the thunk is left to _finish
+            def variable(env):
+                thunk = env[position]
+                return thunk[0] if thunk[1] is None else (V_FORCE, thunk)
+            return variable
+        elif node_type == K_FUN:
+            body = self._compile(node.y)
+            return lambda env: (V_CLOSURE, node, env, body)
+        elif node_type == K_ATOM:
+            value = (V_FREE, node)
+            return lambda env: value
+        elif node_type != K_APP or len(node.x) < 2:
+            error = self._malformed(node)
+            def invalid(env):
+                raise error
+            return invalid
+        head_code = self._compile(node.x[0])
+        arg_codes = tuple(self._compile(item) for item in node.x[1:])
+        # Leave evaluating the head and applying it to the args to _finish
+        return lambda env: (V_APPLY, head_code, env, arg_codes)
+    # Run compiled code in env
+    def _run(self, code, env):
+        return self._finish(code(env))
+    # Finish evaluating value, doing any work left in it in a loop rather than recursing so long chains of calls,
+    # thunks and application heads don't use up the Python stack
+    def _finish(self, value):
+        # Work waiting on value, innermost last, either a tuple of arg thunks to apply it to or a thunk to store it in
+        stack = []
+        while True:
+            value_type = value[0]
+            if value_type == V_CALL:
+                value = value[1](value[2])
+                continue
+            if value_type == V_APPLY:
+                # Args are only evaluated if they are needed, and at most once
+                env = value[2]
+                stack.append(tuple([None, code, env] for code in value[3]))
+                value = value[1](env)
+                continue
+            if value_type == V_FORCE:
+                thunk = value[1]
+                if thunk[1] is None:
+                    value = thunk[0]
+                else:
+                    stack.append(thunk)
+                    value = thunk[1](thunk[2])
+                continue
+            # Value is done, hand it to the work waiting on it
+            if not stack:
+                return value
+            waiting = stack.pop()
+            # Thunk being forced, remember its value
+            if type(waiting) is list:
+                waiting[0] = value
+                waiting[1] = waiting[2] = None
+            # Apply functions to as many args as they take, what's left is applied to the result
+            elif value_type == V_CLOSURE:
+                function = value[1]
+                count = len(function.x)
+                if len(waiting) < count:
+                    raise self._not_enough_args(function, len(waiting))
+                if len(waiting) > count:
+                    stack.append(waiting[count:])
+                value = (V_CALL, value[3], value[2] + waiting[:count])
+            # Head can't be applied
+            else:
+                value = (V_NEUTRAL, value, waiting)
+    # Value of thunk, evaluating it the first time
+    def _force(self, thunk):
+        if thunk[1] is None:
+            return thunk[0]
+        return self._finish((V_FORCE, thunk))
+    # Read value back into a normal form AST node, depth is the number of binders outside of it
+    def _quote(self, value, depth):
+        # Values waiting on a read back node: (function node, depth, None) for its body, or (neutral value, depth, items
+        # read back so far) for its next item
+        stack = []
+        while True:
+            # Go down until reaching a value that reads back to a leaf
+            while True:
+                value_type = value[0]
+                if value_type == V_NEUTRAL:
+                    stack.append((value, depth, []))
+                    value = value[1]
+                # Apply function to its own params to normalize the body
+                elif value_type == V_CLOSURE:
+                    function = value[1]
+                    params = tuple([(V_BOUND, depth + i, name), None, None] for i, name in enumerate(function.x))
+                    stack.append((function, depth, None))
+                    value = self._run(value[3], value[2] + params)
+                    depth += len(params)
+                elif value_type == V_BOUND:
+                    node = Node(K_VAR, depth - value[1] - 1, value[2])
+                    break
+                else:
+                    node = value[1]
+                    break
+            # Go back up, handing node to the values waiting on it
+            while stack:
+                parent, depth, items = stack[-1]
+                if items is None:
+                    stack.pop()
+                    node = Node(K_FUN, parent.x, node)
+                    continue
+                items.append(node)
+                # Read back the next arg
+                if len(items) <= len(parent[2]):
+                    value = self._force(parent[2][len(items) - 1])
+                    break
+                stack.pop()
+                node = Node(K_APP, tuple(items))
+            # Nothing waiting, node is the read back value
+            else:
+                return node
+    # Normalize ast in one walk, contracting in the same order as step but carrying on from each contraction rather than
+    # searching from the root again, nodes still being normalized are kept on a stack like step's path
+    def _walk(self, ast):
+        # Enclosing nodes waiting on node: (function, None, False) for its body, or (application, items normalized so far,
+        # whether the application is a head) for its next item
+        stack = []
+        node = ast
+        # Whether node is the head of an application, which stops as soon as it becomes a function since the application applies it next
+        head = False
+        while True:
+            # Go down until node is normal
+            while True:
+                node_type = node.k
+                if node_type == K_APP:
+                    if len(node.x) < 2:
+                        raise self._malformed(node)
+                    # Contract and keep going on the result
+                    if node.x[0].k == K_FUN:
+                        node = self._contract(node.x)
+                        continue
+                    # Head first, it may become a function
+                    stack.append((node, [], head))
+                    node = node.x[0]
+                    head = True
+                # Function body is reducable, unless the function is about to be applied
+                elif node_type == K_FUN:
+                    if head:
+                        break
+                    stack.append((node, None, False))
+                    node = node.y
+                # Atoms are already normal
+                elif node_type == K_ATOM or node_type == K_VAR:
+                    break
+                else:
+                    raise self._malformed(node)
+            # Go back up, handing node to the nodes waiting on it
+            while stack:
+                parent, items, parent_head = stack[-1]
+                if items is None:
+                    stack.pop()
+                    node = parent if node is parent.y else Node(K_FUN, parent.x, node)
+                    continue
+                # Head became a function, apply it next
+                if not items and node.k == K_FUN:
+                    stack.pop()
+                    node = Node(K_APP, (node, *parent.x[1:]))
+                    head = parent_head
+                    break
+                items.append(node)
+                # Head can't be applied, normalize the rest left to right
+                if len(items) < len(parent.x):
+                    node = parent.x[len(items)]
+                    head = False
+                    break
+                # Done with application, sharing it if nothing changed
+                stack.pop()
+                node = parent if all(new is old for new, old in zip(items, parent.x)) else Node(K_APP, tuple(items))
+            # Nothing waiting, node is the normal form of ast
+            else:
+                return node
+    # Reduce to normal form without searching from the root every step
+    def normalize(self, ast=None):
+        # If didn't pass AST, assume its the root AST
+        if ast is None:
+            ast = self._ast
+        # Compile and evaluate with environments, an error is left to the walk so it is reported just like stepping would
+        try:
+            self._ast = self._quote(self._run(self._compile(ast), ()), 0)
+        except EvaluationException:
+            self._ast = self._walk(ast)
+        return self._ast
+    # Pretty print current AST node as string, scope is the printed names of the binders enclosing node, innermost last
+    def pretty_print(self, node=None, parent_fn=False, parent_app=False, scope=()):
         if node is None:
             node = self._ast
-        node_type = node[0]
-        if node_type == 'ATOM':
-            return node[1]
-        elif node_type == 'APPLICATION':
-            return (
-                ('(' if parent_app else '') + 
-                ' '.join([self.pretty_print(node=x,parent_app=True) for x in node[1]]) +
-                (')' if parent_app else '')
-            )
-        elif node_type == 'FUNCTION':
-            return (
-                ('(' if not parent_fn else '') + 
-                '\\' + 
-                ' '.join(node[1]) + 
-                '.' + 
-                self.pretty_print(node=node[2],parent_fn=True) + 
-                (')' if not parent_fn else '')
-            )
+        return self._print(node, parent_fn, parent_app, scope)[0]
+    # Print node, also returning the printed names of the binders enclosing target the first time it's printed, None if never printed
+    def _print(self, node, parent_fn, parent_app, scope, target=None):
+        # Number nodes in the order they're printed, and note where names are used so that picking param names only has to
+        # look up positions rather than search the function body
+        uses, frees, bodies = self._name_uses(node, len(scope))
+        # Printed names of enclosing binders, innermost last, and their ids
+        names = []
+        binders = []
+        # Position lists of the enclosing binders with each printed name that are referred to, innermost last
+        referred = {}
+        # Bring names of binders into scope, or take them back out
+        def enter(new_names, first):
+            for i, name in enumerate(new_names):
+                used = uses.get(first + i)
+                names.append(name)
+                binders.append(first + i)
+                if used:
+                    referred.setdefault(name, []).append(used)
+        def leave(count):
+            for _ in range(count):
+                if uses.get(binders.pop()):
+                    referred[names[-1]].pop()
+                names.pop()
+        # Scope binders have the first ids
+        enter(scope, 0)
+        # Whether any of positions is in the range start to end
+        def within(positions, start, end):
+            index = bisect_left(positions, start)
+            return index < len(positions) and positions[index] < end
+        target_names = None
+        # Printed pieces, in order, joined once at the end
+        parts = []
+        # Number of functions printed so far
+        functions = 0
+        # Work items, either a piece to print, [names coming into scope, id of the first one], a count of names going out of scope, or (node, parent_fn, parent_app)
+        stack = [(node, parent_fn, parent_app)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item)
+                continue
+            if isinstance(item, int):
+                leave(item)
+                continue
+            if isinstance(item, list):
+                enter(item[0], item[1])
+                continue
+            node, parent_fn, parent_app = item
+            if node is target and target_names is None:
+                target_names = list(names)
+            node_type = node.k
+            # Whether node needs parentheses
+            wrap = (node_type == K_FUN and not parent_fn) or (node_type == K_APP and parent_app)
+            if node_type == K_ATOM:
+                parts.append(node.x)
+            elif node_type == K_VAR:
+                # Use the binder's printed name, or the written name if bound outside of the printed tree
+                parts.append(names[-1 - node.x] if node.x < len(names) else node.y)
+            # Push pieces in reverse so they come off the stack in order
+            elif node_type == K_APP:
+                if wrap:
+                    stack.append(')')
+                for i in range(len(node.x) - 1, -1, -1):
+                    stack.append((node.x[i], False, True))
+                    if i > 0:
+                        stack.append(' ')
+                if wrap:
+                    stack.append('(')
+            elif node_type == K_FUN:
+                start, end, first = bodies[functions]
+                functions += 1
+                # Pick a printed name for each param that doesn't capture anything in the body
+                params = []
+                for i, param in enumerate(node.x):
+                    # A param that is referred to can't share a name with an earlier one, since a repeated param refers to its first occurrence
+                    repeatable = first + i not in uses
+                    name = param
+                    suffix = 0
+                    # Taken if a free name, or a binder outside of the function that is referred to, is used in the body with that name
+                    while ((name in frees and within(frees[name], start, end))
+                           or (referred.get(name) and within(referred[name][-1], start, end))
+                           or (not repeatable and name in params)):
+                        name = param + chr(ord('a') + suffix % 26) * (suffix // 26 + 1)
+                        suffix += 1
+                    params.append(name)
+                # Params are in scope while printing the body
+                if wrap:
+                    stack.append(')')
+                stack.append(len(params))
+                stack.append((node.y, True, False))
+                stack.append([params, first])
+                stack.append('\\' + ' '.join(params) + '.')
+                if wrap:
+                    stack.append('(')
+        return ''.join(parts), target_names
+    # Number the nodes of node in the order printing visits them, with depth binders outside of it, and give each binder an id
+    # starting with the ones outside, returning where each binder is referred to, where each free name is used, and for
+    # each function in order the range of positions of its body and the id of its first param
+    def _name_uses(self, node, depth):
+        uses = {}
+        frees = {}
+        bodies = []
+        position = 0
+        # Ids of the binders enclosing the current node, innermost last
+        binders = list(range(depth))
+        count = depth
+        # Work items, either (node, depth) or the index of a function whose body is done
+        stack = [(node, depth)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, int):
+                bodies[item][1] = position
+                continue
+            node, depth = item
+            node_type = node.k
+            if node_type == K_ATOM:
+                frees.setdefault(node.x, []).append(position)
+            elif node_type == K_VAR:
+                level = depth - 1 - node.x
+                # Bound outside of the printed tree, which prints the written name
+                if level < 0:
+                    frees.setdefault(node.y, []).append(position)
+                else:
+                    uses.setdefault(binders[level], []).append(position)
+            elif node_type == K_FUN:
+                # Params are the innermost binders, body starts at the next position
+                del binders[depth:]
+                binders.extend(range(count, count + len(node.x)))
+                bodies.append([position + 1, None, count])
+                count += len(node.x)
+                stack.append(len(bodies) - 1)
+                stack.append((node.y, depth + len(node.x)))
+            elif node_type == K_APP:
+                stack.extend((item, depth) for item in reversed(node.x))
+            position += 1
+        return uses, frees, bodies
     # Getter for AST
     def get_ast(self):
-        return self._ast[::]
+        return self._ast
     # Setter for AST
     def set_ast(self, ast):
         self._ast = ast
-    # Getter for message
+    # Getter for message, only formatted here since reduce_all never needs it
     def get_message(self):
-        return self._message
+        if self._applied is None:
+            return None
+        function, args, result = self._applied
+        # Name the functions enclosing the application like printing the expression did
+        scope = ()
+        if self._context is not None:
+            ast, redex = self._context
+            scope = self._print(ast, False, False, (), redex)[1] or ()
+        return 'Applied ' + self.pretty_print(node=function, scope=scope) + ' to ' + ' '.join([self.pretty_print(node=x, scope=scope) for x in args]) + ', generating ' + self.pretty_print(node=result, scope=scope)
         
 def main_interactive(stdscr, input_stream):
     # Clear screen
@@ -323,7 +796,7 @@ def main_interactive(stdscr, input_stream):
     stdscr.addstr(4, 2, 'Start')
     # Action index
     action_idx = 0
-    history = [(eval._ast[::], 'Start')]
+    history = [(eval.get_ast(), 'Start')]
     final_idx = None
     while True:
         message = None
@@ -406,5 +879,5 @@ if __name__ == "__main__":
     # Just run interpreter
     else:
         eval = Evaluator(args.expression)
-        eval.reduce_all()
+        eval.normalize()
         print(eval.pretty_print())
\ No newline at end of file